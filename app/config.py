@@ -1,7 +1,8 @@
 """Configuration settings for Light Docker API."""
 
 import os
-from typing import List, Set
+from functools import lru_cache
+from typing import FrozenSet, List, Set
 from uuid import uuid4
 
 from pydantic_settings import BaseSettings
@@ -23,7 +24,7 @@ class Settings(BaseSettings):
 
     # Security settings
     allowed_images: List[str] = []  # Empty means all images allowed
-    blocked_volume_paths: Set[str] = {
+    blocked_volume_paths: FrozenSet[str] = frozenset({
         "/",
         "/etc",
         "/var/run/docker.sock",
@@ -34,7 +35,7 @@ class Settings(BaseSettings):
         "/boot",
         "/root",
         "/home",
-    }
+    })
 
     # Allowed capabilities (empty means none allowed)
     allowed_capabilities: Set[str] = set()
@@ -42,9 +43,18 @@ class Settings(BaseSettings):
     class Config:
         env_prefix = "LIGHT_DOCKER_API_"
 
+    @property
+    def managed_label(self) -> str:
+        """Label marking containers as managed by this API."""
+        return f"{self.label_prefix}.managed"
 
-settings = Settings()
+    @property
+    def instance_label(self) -> str:
+        """Label recording which API instance created a container."""
+        return f"{self.label_prefix}.instance"
 
-# Label constants
-MANAGED_LABEL = f"{settings.label_prefix}.managed"
-INSTANCE_LABEL = f"{settings.label_prefix}.instance"
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Get the shared Settings instance, constructing it on first use."""
+    return Settings()
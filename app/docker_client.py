@@ -1,14 +1,24 @@
-"""Docker SDK wrapper with label-based container tracking."""
+"""Docker SDK wrapper with label-based container tracking.
 
-from datetime import datetime
-from typing import Any, Dict, Generator, List, Optional, Union
+The docker-py SDK is synchronous, so every daemon call is dispatched via
+``run_in_threadpool`` to keep the event loop free while requests are in
+flight. Response assembly stays on the event loop — it is pure CPU work.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Generator, List, Optional, Tuple, Union
 
 import docker
 from docker.errors import APIError, ImageNotFound, NotFound
 from docker.models.containers import Container
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 
-from app.config import INSTANCE_LABEL, MANAGED_LABEL, settings
+from app.config import get_settings
 from app.models import (
     ContainerCreate,
     ContainerCreateResponse,
@@ -25,38 +35,147 @@ class DockerClientError(HTTPException):
         super().__init__(status_code=status_code, detail=message)
 
 
+# How long a managed/not-managed verdict for a container id stays valid.
+# Labels are immutable for a container's lifetime, so this only bounds how
+# long a stale entry survives after a container is removed out-of-band.
+MANAGED_CACHE_TTL = 5.0
+
+# Upper bound on concurrent inspect calls during a deep list fan-out, so a
+# large container count cannot overwhelm the daemon (or the threadpool).
+LIST_INSPECT_CONCURRENCY = 32
+
+# How long a daemon ping verdict stays valid. Health probes arrive several
+# times a second per replica; one daemon round-trip per second is plenty.
+PING_CACHE_TTL = 1.0
+
+# Size of the connection pool to the Docker daemon. docker-py's default of
+# 10 makes concurrent stats/list polling queue on pool checkout.
+DOCKER_MAX_POOL_SIZE = 64
+
+# Request fields copied verbatim into docker-py create kwargs when set.
+_SIMPLE_CREATE_FIELDS = (
+    "name",
+    "command",
+    "entrypoint",
+    "environment",
+    "working_dir",
+    "user",
+    "hostname",
+    "network",
+    "mem_limit",
+    "cpu_period",
+    "cpu_quota",
+)
+
+
+def _parse_docker_ts(value: str) -> datetime:
+    """Parse a Docker RFC3339 timestamp (nanosecond precision, Z suffix).
+
+    The inspect payload always uses the fixed layout
+    ``YYYY-MM-DDTHH:MM:SS.nnnnnnnnnZ``, so slicing digit runs directly is
+    cheaper than the generic fromisoformat machinery (which also needs the
+    Z-suffix string rewrite). Anything else falls back to the stdlib.
+    """
+    try:
+        if value[-1] == "Z" and value[19] == ".":
+            frac = value[20:-1][:6]
+            return datetime(
+                int(value[0:4]),
+                int(value[5:7]),
+                int(value[8:10]),
+                int(value[11:13]),
+                int(value[14:16]),
+                int(value[17:19]),
+                int(frac) * 10 ** (6 - len(frac)),
+                tzinfo=timezone.utc,
+            )
+    except (ValueError, IndexError):
+        pass
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _build_ports(ports: Dict[str, Any]) -> Dict[str, Any]:
+    """Translate request port bindings into docker-py's ports argument."""
+    built: Dict[str, Any] = {}
+    for container_port, host_binding in ports.items():
+        if isinstance(host_binding, int):
+            built[container_port] = host_binding
+        elif isinstance(host_binding, dict):
+            built[container_port] = (
+                host_binding.get("host_ip", "0.0.0.0"),
+                host_binding.get("host_port"),
+            )
+        elif isinstance(host_binding, list):
+            built[container_port] = [
+                (b.get("host_ip", "0.0.0.0"), b.get("host_port"))
+                for b in host_binding
+            ]
+    return built
+
+
+def _build_volumes(volumes: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Translate request volume bindings into docker-py's volumes argument."""
+    return {
+        host_path: {"bind": config["bind"], "mode": config["mode"]}
+        for host_path, config in volumes.items()
+    }
+
+
+def _build_restart_policy(policy: Dict[str, Any]) -> Dict[str, Any]:
+    """Translate a request restart policy into docker-py's argument shape."""
+    return {
+        "Name": policy["name"],
+        "MaximumRetryCount": policy["maximum_retry_count"],
+    }
+
+
 class DockerManager:
     """Manager for Docker operations with label-based tracking."""
 
     def __init__(self):
         """Initialize the Docker client."""
         try:
-            self.client = docker.from_env()
+            self.client = docker.from_env(max_pool_size=DOCKER_MAX_POOL_SIZE)
         except Exception as e:
             raise RuntimeError(f"Failed to connect to Docker: {e}")
 
+        settings = get_settings()
         self.instance_id = settings.instance_id
+        self._managed_label = settings.managed_label
+        self._instance_label = settings.instance_label
+
+        # Memoized managed checks: container id -> (managed, expires_at)
+        self._managed_cache: Dict[str, Tuple[bool, float]] = {}
+
+        # Last daemon ping verdict: (ok, checked_at)
+        self._ping_cache: Optional[Tuple[bool, float]] = None
+
+        # Constant after startup; build once instead of per call. The
+        # proxy keeps callers from mutating the shared base labels.
+        self._managed_filter = {"label": f"{self._managed_label}=true"}
+        self._base_labels = MappingProxyType({
+            self._managed_label: "true",
+            self._instance_label: self.instance_id,
+        })
 
     def _get_managed_labels(self, extra_labels: Optional[Dict[str, str]] = None) -> Dict[str, str]:
         """Get the labels to apply to managed containers."""
-        labels = {
-            MANAGED_LABEL: "true",
-            INSTANCE_LABEL: self.instance_id,
-        }
         if extra_labels:
-            labels.update(extra_labels)
-        return labels
+            return {**self._base_labels, **extra_labels}
+        return dict(self._base_labels)
 
     def _container_to_response(self, container: Container) -> ContainerResponse:
-        """Convert a Docker container to a response model."""
-        container.reload()  # Ensure we have the latest state
+        """Convert a Docker container to a response model.
+
+        Uses the container's ``attrs`` as-is; callers that need fresher
+        state must reload the container first.
+        """
         attrs = container.attrs
 
         # Parse creation time
         created_str = attrs.get("Created", "")
         try:
-            # Docker uses ISO format with nanoseconds
-            created = datetime.fromisoformat(created_str.replace("Z", "+00:00"))
+            created = _parse_docker_ts(created_str)
         except (ValueError, AttributeError):
             created = datetime.now()
 
@@ -72,12 +191,14 @@ class DockerManager:
                         for b in bindings
                     ]
 
-        # Get image name
-        image_name = attrs.get("Config", {}).get("Image", "")
-        if not image_name and container.image:
-            image_name = container.image.tags[0] if container.image.tags else container.image.short_id
+        # Get image name; fall back to the image ID from the inspect
+        # payload rather than container.image, which issues another
+        # GET /images/{id}/json round-trip behind the scenes.
+        image_name = attrs.get("Config", {}).get("Image") or attrs.get("Image", "")[:19]
 
-        return ContainerResponse(
+        # model_construct skips field validation; these values come from
+        # the daemon via our own code, not from user input.
+        return ContainerResponse.model_construct(
             id=container.id,
             short_id=container.short_id,
             name=container.name,
@@ -85,25 +206,69 @@ class DockerManager:
             status=container.status,
             created=created,
             ports=ports,
-            labels=attrs.get("Config", {}).get("Labels", {}),
+            labels=attrs.get("Config", {}).get("Labels") or {},
+        )
+
+    def _list_entry_to_response(self, container: Container) -> ContainerResponse:
+        """Convert a sparse container (from a list call) to a response model.
+
+        List responses carry a different attrs shape than inspect responses
+        (``Names`` instead of ``Name``, epoch ``Created``, flat ``Ports``
+        list), but contain everything the response model needs without
+        another daemon round-trip.
+        """
+        attrs = container.attrs
+
+        names = attrs.get("Names") or []
+        name = names[0].lstrip("/") if names else ""
+
+        created = datetime.fromtimestamp(attrs.get("Created", 0), tz=timezone.utc)
+
+        # List responses use a flat port list; convert to the inspect shape.
+        ports: Dict[str, Any] = {}
+        for binding in attrs.get("Ports") or []:
+            if "PublicPort" not in binding:
+                continue
+            key = f"{binding.get('PrivatePort')}/{binding.get('Type', 'tcp')}"
+            ports.setdefault(key, []).append(
+                {"HostIp": binding.get("IP", ""), "HostPort": str(binding["PublicPort"])}
+            )
+
+        return ContainerResponse.model_construct(
+            id=container.id,
+            short_id=container.short_id,
+            name=name,
+            image=attrs.get("Image", ""),
+            status=container.status,
+            created=created,
+            ports=ports,
+            labels=attrs.get("Labels") or {},
         )
 
     def is_managed(self, container: Container) -> bool:
         """Check if a container is managed by this API."""
         labels = container.labels or {}
-        return labels.get(MANAGED_LABEL) == "true"
+        return labels.get(self._managed_label) == "true"
 
-    def get_managed_container(self, container_id: str) -> Container:
+    async def get_managed_container(self, container_id: str) -> Container:
         """Get a container by ID, ensuring it's managed by this API."""
         try:
-            container = self.client.containers.get(container_id)
+            container = await run_in_threadpool(self.client.containers.get, container_id)
         except NotFound:
             raise DockerClientError(
                 f"Container '{container_id}' not found",
                 status_code=status.HTTP_404_NOT_FOUND,
             )
 
-        if not self.is_managed(container):
+        now = time.monotonic()
+        cached = self._managed_cache.get(container.id)
+        if cached is not None and cached[1] > now:
+            managed = cached[0]
+        else:
+            managed = self.is_managed(container)
+            self._managed_cache[container.id] = (managed, now + MANAGED_CACHE_TTL)
+
+        if not managed:
             raise DockerClientError(
                 f"Container '{container_id}' is not managed by this API",
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -111,98 +276,66 @@ class DockerManager:
 
         return container
 
-    def list_managed(self, all_containers: bool = True) -> List[ContainerResponse]:
-        """List all containers managed by this API."""
+    async def list_managed(
+        self, all_containers: bool = True, deep: bool = False
+    ) -> List[ContainerResponse]:
+        """List all containers managed by this API.
+
+        With ``deep=True`` every container is additionally inspected (in
+        parallel, bounded by ``LIST_INSPECT_CONCURRENCY``) so the response
+        reflects full inspect state rather than the lighter list payload.
+        """
         try:
-            containers = self.client.containers.list(
+            # sparse=True keeps docker-py from inspecting every container;
+            # the daemon's label-filtered list response is all we need.
+            containers = await run_in_threadpool(
+                self.client.containers.list,
                 all=all_containers,
-                filters={"label": f"{MANAGED_LABEL}=true"},
+                sparse=True,
+                filters=self._managed_filter,
             )
         except APIError as e:
             raise DockerClientError(f"Failed to list containers: {e}")
 
-        return [self._container_to_response(c) for c in containers]
+        if not deep:
+            return [self._list_entry_to_response(c) for c in containers]
+
+        semaphore = asyncio.Semaphore(LIST_INSPECT_CONCURRENCY)
+
+        async def _inspect(container: Container) -> ContainerResponse:
+            async with semaphore:
+                await run_in_threadpool(container.reload)
+            return self._container_to_response(container)
+
+        return list(await asyncio.gather(*(_inspect(c) for c in containers)))
 
-    def create_container(self, request: ContainerCreate) -> ContainerCreateResponse:
+    async def create_container(self, request: ContainerCreate) -> ContainerCreateResponse:
         """Create a new container with managed labels."""
-        # Prepare labels
-        labels = self._get_managed_labels(request.labels)
-
-        # Prepare port bindings
-        ports = None
-        if request.ports:
-            ports = {}
-            for container_port, host_binding in request.ports.items():
-                if isinstance(host_binding, int):
-                    ports[container_port] = host_binding
-                elif isinstance(host_binding, dict):
-                    ports[container_port] = (
-                        host_binding.get("host_ip", "0.0.0.0"),
-                        host_binding.get("host_port"),
-                    )
-                elif isinstance(host_binding, list):
-                    ports[container_port] = [
-                        (b.get("host_ip", "0.0.0.0"), b.get("host_port"))
-                        for b in host_binding
-                    ]
+        # One model_dump pass replaces per-attribute access; unset fields
+        # disappear entirely so the option table below can key on presence.
+        req = request.model_dump(exclude_none=True)
 
-        # Prepare volumes
-        volumes = None
-        if request.volumes:
-            volumes = {
-                host_path: {
-                    "bind": config.bind,
-                    "mode": config.mode,
-                }
-                for host_path, config in request.volumes.items()
-            }
-
-        # Prepare restart policy
-        restart_policy = None
-        if request.restart_policy:
-            restart_policy = {
-                "Name": request.restart_policy.name,
-                "MaximumRetryCount": request.restart_policy.maximum_retry_count,
-            }
-
-        # Build container options
         container_options: Dict[str, Any] = {
-            "image": request.image,
-            "labels": labels,
+            "image": req["image"],
+            "labels": self._get_managed_labels(req.get("labels")),
             "detach": True,
         }
 
-        if request.name:
-            container_options["name"] = request.name
-        if request.command:
-            container_options["command"] = request.command
-        if request.entrypoint:
-            container_options["entrypoint"] = request.entrypoint
-        if request.environment:
-            container_options["environment"] = request.environment
-        if ports:
-            container_options["ports"] = ports
-        if volumes:
-            container_options["volumes"] = volumes
-        if restart_policy:
-            container_options["restart_policy"] = restart_policy
-        if request.working_dir:
-            container_options["working_dir"] = request.working_dir
-        if request.user:
-            container_options["user"] = request.user
-        if request.hostname:
-            container_options["hostname"] = request.hostname
-        if request.network:
-            container_options["network"] = request.network
-        if request.mem_limit:
-            container_options["mem_limit"] = request.mem_limit
-        if request.cpu_period:
-            container_options["cpu_period"] = request.cpu_period
-        if request.cpu_quota:
-            container_options["cpu_quota"] = request.cpu_quota
+        for field in _SIMPLE_CREATE_FIELDS:
+            if field in req:
+                container_options[field] = req[field]
+
+        if "ports" in req:
+            container_options["ports"] = _build_ports(req["ports"])
+        if "volumes" in req:
+            container_options["volumes"] = _build_volumes(req["volumes"])
+        if "restart_policy" in req:
+            container_options["restart_policy"] = _build_restart_policy(req["restart_policy"])
 
         try:
-            container = self.client.containers.create(**container_options)
+            container = await run_in_threadpool(
+                self.client.containers.create, **container_options
+            )
         except ImageNotFound:
             raise DockerClientError(
                 f"Image '{request.image}' not found",
@@ -217,44 +350,47 @@ class DockerManager:
             warnings=[],
         )
 
-    def inspect_container(self, container_id: str) -> ContainerResponse:
+    async def inspect_container(self, container_id: str) -> ContainerResponse:
         """Get detailed information about a container."""
-        container = self.get_managed_container(container_id)
+        # get_managed_container just inspected the container, so its attrs
+        # are already fresh; reloading here would repeat the same call.
+        container = await self.get_managed_container(container_id)
         return self._container_to_response(container)
 
-    def start_container(self, container_id: str) -> None:
+    async def start_container(self, container_id: str) -> None:
         """Start a container."""
-        container = self.get_managed_container(container_id)
+        container = await self.get_managed_container(container_id)
         try:
-            container.start()
+            await run_in_threadpool(container.start)
         except APIError as e:
             raise DockerClientError(f"Failed to start container: {e}")
 
-    def stop_container(self, container_id: str, timeout: int = 10) -> None:
+    async def stop_container(self, container_id: str, timeout: int = 10) -> None:
         """Stop a container."""
-        container = self.get_managed_container(container_id)
+        container = await self.get_managed_container(container_id)
         try:
-            container.stop(timeout=timeout)
+            await run_in_threadpool(container.stop, timeout=timeout)
         except APIError as e:
             raise DockerClientError(f"Failed to stop container: {e}")
 
-    def restart_container(self, container_id: str, timeout: int = 10) -> None:
+    async def restart_container(self, container_id: str, timeout: int = 10) -> None:
         """Restart a container."""
-        container = self.get_managed_container(container_id)
+        container = await self.get_managed_container(container_id)
         try:
-            container.restart(timeout=timeout)
+            await run_in_threadpool(container.restart, timeout=timeout)
         except APIError as e:
             raise DockerClientError(f"Failed to restart container: {e}")
 
-    def remove_container(self, container_id: str, force: bool = False, v: bool = False) -> None:
+    async def remove_container(self, container_id: str, force: bool = False, v: bool = False) -> None:
         """Remove a container."""
-        container = self.get_managed_container(container_id)
+        container = await self.get_managed_container(container_id)
         try:
-            container.remove(force=force, v=v)
+            await run_in_threadpool(container.remove, force=force, v=v)
         except APIError as e:
             raise DockerClientError(f"Failed to remove container: {e}")
+        self._managed_cache.pop(container.id, None)
 
-    def get_logs(
+    async def get_logs(
         self,
         container_id: str,
         stdout: bool = True,
@@ -264,9 +400,10 @@ class DockerManager:
         until: Optional[int] = None,
     ) -> ContainerLogsResponse:
         """Get container logs."""
-        container = self.get_managed_container(container_id)
+        container = await self.get_managed_container(container_id)
         try:
-            logs = container.logs(
+            logs = await run_in_threadpool(
+                container.logs,
                 stdout=stdout,
                 stderr=stderr,
                 tail=tail,
@@ -283,22 +420,61 @@ class DockerManager:
             container_id=container_id,
         )
 
-    def get_stats(self, container_id: str, stream: bool = False) -> ContainerStatsResponse:
+    async def stream_logs(
+        self,
+        container_id: str,
+        stdout: bool = True,
+        stderr: bool = True,
+        tail: Union[int, str] = "all",
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+    ) -> Generator[bytes, None, None]:
+        """Get container logs as a raw byte-chunk iterator.
+
+        Unlike get_logs this never materializes (or decodes) the full log
+        in memory; chunks flow straight from the daemon to the response.
+        """
+        container = await self.get_managed_container(container_id)
+        try:
+            return await run_in_threadpool(
+                container.logs,
+                stream=True,
+                follow=False,
+                stdout=stdout,
+                stderr=stderr,
+                tail=tail,
+                since=since,
+                until=until,
+            )
+        except APIError as e:
+            raise DockerClientError(f"Failed to get logs: {e}")
+
+    @staticmethod
+    def _read_stats(container: Container, stream: bool) -> Dict[str, Any]:
+        """Fetch one stats sample from the daemon (blocking)."""
+        stats = container.stats(stream=stream)
+        if isinstance(stats, Generator):
+            stats = next(stats)
+        return stats
+
+    async def get_stats(self, container_id: str, stream: bool = False) -> ContainerStatsResponse:
         """Get container stats."""
-        container = self.get_managed_container(container_id)
+        container = await self.get_managed_container(container_id)
         try:
-            stats = container.stats(stream=stream)
-            if isinstance(stats, Generator):
-                stats = next(stats)
+            stats = await run_in_threadpool(self._read_stats, container, stream)
         except APIError as e:
             raise DockerClientError(f"Failed to get stats: {e}")
 
-        # Parse CPU stats
-        cpu_delta = stats.get("cpu_stats", {}).get("cpu_usage", {}).get("total_usage", 0) - \
-            stats.get("precpu_stats", {}).get("cpu_usage", {}).get("total_usage", 0)
-        system_delta = stats.get("cpu_stats", {}).get("system_cpu_usage", 0) - \
-            stats.get("precpu_stats", {}).get("system_cpu_usage", 0)
-        num_cpus = len(stats.get("cpu_stats", {}).get("cpu_usage", {}).get("percpu_usage", [1]))
+        # Parse CPU stats (bind the sub-dicts once instead of re-walking
+        # the stats payload for every field)
+        cpu_stats = stats.get("cpu_stats", {})
+        precpu_stats = stats.get("precpu_stats", {})
+        cpu_usage = cpu_stats.get("cpu_usage", {})
+        cpu_delta = cpu_usage.get("total_usage", 0) - \
+            precpu_stats.get("cpu_usage", {}).get("total_usage", 0)
+        system_delta = cpu_stats.get("system_cpu_usage", 0) - \
+            precpu_stats.get("system_cpu_usage", 0)
+        num_cpus = len(cpu_usage.get("percpu_usage", [1]))
 
         cpu_percent = 0.0
         if system_delta > 0 and cpu_delta > 0:
@@ -310,12 +486,13 @@ class DockerManager:
         memory_limit = memory_stats.get("limit", 1)
         memory_percent = (memory_usage / memory_limit) * 100.0 if memory_limit > 0 else 0.0
 
-        # Parse network stats
-        networks = stats.get("networks", {})
-        network_rx = sum(n.get("rx_bytes", 0) for n in networks.values())
-        network_tx = sum(n.get("tx_bytes", 0) for n in networks.values())
+        # Parse network stats in a single pass
+        network_rx = network_tx = 0
+        for network in stats.get("networks", {}).values():
+            network_rx += network.get("rx_bytes", 0)
+            network_tx += network.get("tx_bytes", 0)
 
-        return ContainerStatsResponse(
+        return ContainerStatsResponse.model_construct(
             container_id=container_id,
             cpu_percent=round(cpu_percent, 2),
             memory_usage=memory_usage,
@@ -325,22 +502,27 @@ class DockerManager:
             network_tx_bytes=network_tx,
         )
 
-    def ping(self) -> bool:
-        """Check if Docker daemon is accessible."""
-        try:
-            self.client.ping()
-            return True
-        except Exception:
-            return False
+    async def ping(self) -> bool:
+        """Check if Docker daemon is accessible.
 
+        The verdict is cached for PING_CACHE_TTL seconds so frequent
+        health probes don't each cost a daemon round-trip.
+        """
+        now = time.monotonic()
+        cached = self._ping_cache
+        if cached is not None and now - cached[1] < PING_CACHE_TTL:
+            return cached[0]
 
-# Global instance (created on first import)
-docker_manager: Optional[DockerManager] = None
+        try:
+            await run_in_threadpool(self.client.ping)
+            ok = True
+        except Exception:
+            ok = False
+        self._ping_cache = (ok, now)
+        return ok
 
 
+@lru_cache(maxsize=1)
 def get_docker_manager() -> DockerManager:
-    """Get or create the Docker manager instance."""
-    global docker_manager
-    if docker_manager is None:
-        docker_manager = DockerManager()
-    return docker_manager
+    """Get the shared Docker manager instance, constructing it on first use."""
+    return DockerManager()
@@ -4,18 +4,21 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
-from app.config import settings
+from app.config import get_settings
 from app.docker_client import get_docker_manager
 from app.routes import containers
 
+settings = get_settings()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
     # Startup: Initialize Docker client and verify connection
     docker = get_docker_manager()
-    if not docker.ping():
+    if not await docker.ping():
         raise RuntimeError("Cannot connect to Docker daemon")
     print(f"Connected to Docker daemon, instance ID: {docker.instance_id}")
     yield
@@ -27,6 +30,7 @@ app = FastAPI(
     title=settings.api_title,
     version=settings.api_version,
     description="A simplified, secure REST API for Docker container operations",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan,
 )
 
@@ -57,7 +61,7 @@ async def root():
 async def health():
     """Health check endpoint."""
     docker = get_docker_manager()
-    docker_ok = docker.ping()
+    docker_ok = await docker.ping()
     return {
         "status": "healthy" if docker_ok else "unhealthy",
         "docker": "connected" if docker_ok else "disconnected",
@@ -2,7 +2,9 @@
 
 from typing import Optional
 
-from fastapi import APIRouter, Body, Depends, Query
+from fastapi import APIRouter, Body, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 
 from app.docker_client import DockerManager, get_docker_manager
 from app.models import (
@@ -18,19 +20,27 @@ from app.security import validate_container_request
 
 router = APIRouter(prefix="/containers", tags=["containers"])
 
+# Serializing through a prebuilt TypeAdapter and returning a raw Response
+# skips FastAPI's second validation pass over models our own code already
+# built; the decorators keep response_model purely for the OpenAPI schema.
+_LIST_ADAPTER = TypeAdapter(ContainerListResponse)
+_STATS_ADAPTER = TypeAdapter(ContainerStatsResponse)
+
 
 @router.get("", response_model=ContainerListResponse)
 async def list_containers(
     all: bool = Query(True, description="Include stopped containers"),
+    deep: bool = Query(False, description="Inspect each container for full state"),
     docker: DockerManager = Depends(get_docker_manager),
-) -> ContainerListResponse:
+) -> Response:
     """
     List all containers managed by this API.
 
     Only containers created through this API (with managed labels) will be returned.
     """
-    containers = docker.list_managed(all_containers=all)
-    return ContainerListResponse(containers=containers, count=len(containers))
+    containers = await docker.list_managed(all_containers=all, deep=deep)
+    result = ContainerListResponse.model_construct(containers=containers, count=len(containers))
+    return Response(content=_LIST_ADAPTER.dump_json(result), media_type="application/json")
 
 
 @router.post("/create", response_model=ContainerCreateResponse)
@@ -55,7 +65,7 @@ async def create_container(
     validate_container_request(request)
 
     # Create the container
-    return docker.create_container(request)
+    return await docker.create_container(request)
 
 
 @router.get("/{container_id}", response_model=ContainerResponse)
@@ -68,7 +78,7 @@ async def inspect_container(
 
     Only managed containers can be inspected.
     """
-    return docker.inspect_container(container_id)
+    return await docker.inspect_container(container_id)
 
 
 @router.post("/{container_id}/start", response_model=MessageResponse)
@@ -81,7 +91,7 @@ async def start_container(
 
     Only managed containers can be started.
     """
-    docker.start_container(container_id)
+    await docker.start_container(container_id)
     return MessageResponse(message="Container started", container_id=container_id)
 
 
@@ -96,7 +106,7 @@ async def stop_container(
 
     Only managed containers can be stopped.
     """
-    docker.stop_container(container_id, timeout=timeout)
+    await docker.stop_container(container_id, timeout=timeout)
     return MessageResponse(message="Container stopped", container_id=container_id)
 
 
@@ -111,7 +121,7 @@ async def restart_container(
 
     Only managed containers can be restarted.
     """
-    docker.restart_container(container_id, timeout=timeout)
+    await docker.restart_container(container_id, timeout=timeout)
     return MessageResponse(message="Container restarted", container_id=container_id)
 
 
@@ -127,7 +137,7 @@ async def remove_container(
 
     Only managed containers can be removed.
     """
-    docker.remove_container(container_id, force=force, v=v)
+    await docker.remove_container(container_id, force=force, v=v)
     return MessageResponse(message="Container removed", container_id=container_id)
 
 
@@ -136,7 +146,7 @@ async def get_container_logs(
     container_id: str,
     stdout: bool = Query(True, description="Include stdout"),
     stderr: bool = Query(True, description="Include stderr"),
-    tail: int = Query(100, ge=0, description="Number of lines from end (0 for all)"),
+    tail: int = Query(100, ge=1, le=10000, description="Number of lines from end"),
     since: Optional[int] = Query(None, description="Unix timestamp to start from"),
     until: Optional[int] = Query(None, description="Unix timestamp to end at"),
     docker: DockerManager = Depends(get_docker_manager),
@@ -144,10 +154,38 @@ async def get_container_logs(
     """
     Get logs from a container.
 
+    The tail size is capped; use the streaming endpoint to retrieve full
+    logs. Only managed containers can have their logs retrieved.
+    """
+    return await docker.get_logs(
+        container_id,
+        stdout=stdout,
+        stderr=stderr,
+        tail=tail,
+        since=since,
+        until=until,
+    )
+
+
+@router.get("/{container_id}/logs/stream")
+async def stream_container_logs(
+    container_id: str,
+    stdout: bool = Query(True, description="Include stdout"),
+    stderr: bool = Query(True, description="Include stderr"),
+    tail: int = Query(0, ge=0, description="Number of lines from end (0 for all)"),
+    since: Optional[int] = Query(None, description="Unix timestamp to start from"),
+    until: Optional[int] = Query(None, description="Unix timestamp to end at"),
+    docker: DockerManager = Depends(get_docker_manager),
+) -> StreamingResponse:
+    """
+    Stream logs from a container as plain text.
+
+    Unlike the JSON logs endpoint, the log output is streamed chunk by
+    chunk without being buffered in memory, so it is safe for large logs.
     Only managed containers can have their logs retrieved.
     """
     tail_value = "all" if tail == 0 else tail
-    return docker.get_logs(
+    chunks = await docker.stream_logs(
         container_id,
         stdout=stdout,
         stderr=stderr,
@@ -155,17 +193,19 @@ async def get_container_logs(
         since=since,
         until=until,
     )
+    return StreamingResponse(chunks, media_type="text/plain")
 
 
 @router.get("/{container_id}/stats", response_model=ContainerStatsResponse)
 async def get_container_stats(
     container_id: str,
     docker: DockerManager = Depends(get_docker_manager),
-) -> ContainerStatsResponse:
+) -> Response:
     """
     Get resource usage statistics for a container.
 
     Returns CPU, memory, and network statistics.
     Only managed containers can have their stats retrieved.
     """
-    return docker.get_stats(container_id)
+    stats = await docker.get_stats(container_id)
+    return Response(content=_STATS_ADAPTER.dump_json(stats), media_type="application/json")
@@ -1,82 +1,192 @@
 """Security validation for container creation requests."""
 
+import os
+import re
+from bisect import bisect_left
+from collections import deque
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 from fastapi import HTTPException, status
 
-from app.config import settings
+from app.config import get_settings
 from app.models import ContainerCreate
 
 
 class SecurityValidationError(HTTPException):
     """Exception raised when security validation fails."""
 
+    # No instance dict of our own; message and the HTTPException fields
+    # land in the base class storage.
+    __slots__ = ()
+
     def __init__(self, message: str):
+        self.message = message
         super().__init__(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Security validation failed: {message}",
         )
 
 
+def refresh_security_settings() -> None:
+    """Rebuild the module-level validation tables from current settings.
+
+    Security settings are fixed for the process lifetime, so the hot
+    validators read these precomputed structures instead of going
+    through the settings object on every request. Called once at import;
+    tests that reload settings call it again to re-bind the tables.
+    """
+    global _ALLOWED_RE, _BLOCKED_EXACT, _BLOCKED_SORTED
+    global _ALLOWED_CAPS_UPPER, _NO_IMAGE_CHECK, _NO_VOLUME_CHECK, _FAST_NOOP
+
+    settings = get_settings()
+
+    _ALLOWED_RE = _compile_allowed_images(settings.allowed_images)
+
+    # Blocked mount points normalized once, in both lexical and
+    # symlink-resolved forms (e.g. /var/run and /run) so the
+    # request-time check can stay purely lexical and still catch either
+    # spelling.
+    _BLOCKED_EXACT = frozenset(
+        _collapse_root(form)
+        for blocked in settings.blocked_volume_paths
+        for form in (os.path.normpath(blocked), str(Path(blocked).resolve()))
+    )
+
+    # The same paths as a sorted tuple: all blocked entries lying under
+    # a given mount form one contiguous run, found with a single bisect.
+    _BLOCKED_SORTED = tuple(sorted(_BLOCKED_EXACT))
+
+    # Allowed capabilities, uppercased so each request is a hash lookup.
+    _ALLOWED_CAPS_UPPER = frozenset(
+        cap.upper() for cap in settings.allowed_capabilities
+    )
+
+    # Partial evaluation on the configuration: with an empty allow-list
+    # every image passes, and with no blocked paths every mount passes,
+    # so the corresponding checks can be skipped outright. The dangerous
+    # raw-data options are always enforced and stay outside these flags.
+    _NO_IMAGE_CHECK = _ALLOWED_RE is None
+    _NO_VOLUME_CHECK = not _BLOCKED_EXACT
+    _FAST_NOOP = _NO_IMAGE_CHECK and _NO_VOLUME_CHECK
+
+    # Memoized verdicts are only valid for the tables they were computed
+    # against.
+    _validate_cached.cache_clear()
+
+
+# Volume failure messages, hoisted so the validators' bodies stay small;
+# the f-string work happens only on the failing path.
+_MSG_INVALID = "Invalid volume path: {}"
+_MSG_BLOCKED = "Volume mount to '{}' is not allowed"
+_MSG_OVERLAP = "Volume mount to '{}' is not allowed (overlaps with protected path)"
+_MSG_EXPOSE = "Volume mount to '{}' is not allowed (would expose protected paths)"
+_VERDICT_MESSAGES = {"exact": _MSG_BLOCKED, "overlap": _MSG_OVERLAP, "expose": _MSG_EXPOSE}
+
+
+def _collapse_root(path: str) -> str:
+    """Collapse a POSIX-reserved double-slash root to a single slash.
+
+    normpath leaves exactly two leading slashes alone, but the Docker
+    daemon and the kernel treat //etc the same as /etc, so the blocked
+    tables and incoming mounts must agree on the single-slash form.
+    """
+    if path.startswith("//"):
+        return "/" + path.lstrip("/")
+    return path
+
+
+def _reject(message: str, path: str) -> None:
+    """Raise a SecurityValidationError for a rejected volume path."""
+    raise SecurityValidationError(message.format(path))
+
+
+def _compile_allowed_images(allowed: List[str]) -> "Optional[re.Pattern[str]]":
+    """Compile the allowed-image list into one anchored alternation.
+
+    Each entry matches exactly or as a repository prefix followed by a
+    tag, and a `*` in an entry matches any run of non-colon characters,
+    so matching stays O(len(image)) however many entries there are.
+    Returns None for an empty list, which allows every image.
+    """
+    if not allowed:
+        return None
+    branches = "|".join(
+        re.escape(entry).replace(r"\*", "[^:]*") for entry in allowed
+    )
+    return re.compile(f"^(?:{branches})(?::|$)")
+
+
 def validate_image(image: str) -> None:
     """Validate that the image is allowed."""
-    if not settings.allowed_images:
+    pattern = _ALLOWED_RE
+    if pattern is None or pattern.match(image) is not None:
         return  # All images allowed if list is empty
 
-    # Check if image matches any allowed pattern
-    for allowed in settings.allowed_images:
-        if image == allowed or image.startswith(f"{allowed}:"):
-            return
-
     raise SecurityValidationError(
         f"Image '{image}' is not in the allowed images list"
     )
 
 
+def _match_blocked(normalized: str) -> Optional[str]:
+    """Classify a normalized mount path against the blocked tables.
+
+    Returns "exact" for a blocked path itself, "overlap" when the mount
+    sits inside a protected path, "expose" when a protected path sits
+    inside the mount, or None when unrelated. Ancestors are O(depth)
+    hash lookups (blocked entries can nest, so no single sorted
+    neighbour suffices); descendants are one bisect into the sorted
+    table. Nothing scans the full blocked set.
+    """
+    exact = _BLOCKED_EXACT
+    if not exact:
+        return None
+    if normalized in exact:
+        return "exact"
+
+    # Mount inside a blocked path: test each ancestor directly
+    if "/" in exact:
+        return "overlap"
+    ancestor = normalized
+    while True:
+        ancestor = ancestor[: ancestor.rfind("/")]
+        if not ancestor:
+            break
+        if ancestor in exact:
+            return "overlap"
+
+    # Blocked path inside the mount: any such entry sorts in a
+    # contiguous run immediately at or after the slash-terminated mount
+    candidate = normalized if normalized.endswith("/") else normalized + "/"
+    index = bisect_left(_BLOCKED_SORTED, candidate)
+    if index < len(_BLOCKED_SORTED) and _BLOCKED_SORTED[index].startswith(candidate):
+        return "expose"
+    return None
+
+
 def validate_volume_path(host_path: str) -> None:
     """Validate that a volume mount path is safe."""
-    # Normalize the path
+    # Lexical normalization only: a policy check on a user-supplied mount
+    # point needs no stat or symlink syscalls, unlike Path.resolve
     try:
-        normalized = Path(host_path).resolve()
-    except Exception:
-        raise SecurityValidationError(f"Invalid volume path: {host_path}")
-
-    # Check against blocked paths
-    normalized_str = str(normalized)
-    for blocked in settings.blocked_volume_paths:
-        blocked_path = Path(blocked).resolve()
-        # Block exact matches and subdirectories of blocked paths
-        if normalized == blocked_path:
-            raise SecurityValidationError(
-                f"Volume mount to '{host_path}' is not allowed"
-            )
-        # Also block if it's trying to mount a parent of a sensitive path
-        try:
-            normalized.relative_to(blocked_path)
-            raise SecurityValidationError(
-                f"Volume mount to '{host_path}' is not allowed (overlaps with protected path)"
-            )
-        except ValueError:
-            pass  # Not a subdirectory, which is fine
+        normalized = _collapse_root(os.path.normpath(os.path.abspath(host_path)))
+    except (TypeError, ValueError):
+        _reject(_MSG_INVALID, host_path)
 
-        # Block if the blocked path is a subdirectory of the mount
-        try:
-            blocked_path.relative_to(normalized)
-            raise SecurityValidationError(
-                f"Volume mount to '{host_path}' is not allowed (would expose protected paths)"
-            )
-        except ValueError:
-            pass
+    verdict = _match_blocked(normalized)
+    if verdict is not None:
+        _reject(_VERDICT_MESSAGES[verdict], host_path)
 
 
-def validate_volumes(volumes: Optional[Dict[str, Any]]) -> None:
-    """Validate all volume mounts."""
-    if not volumes:
+def validate_volumes(host_paths: Optional[Iterable[str]]) -> None:
+    """Validate all volume mount host paths."""
+    if not host_paths:
         return
 
-    for host_path in volumes.keys():
-        validate_volume_path(host_path)
+    # map + zero-length deque consumes the iterator in C; the only
+    # Python-level work per path is the validator call itself
+    deque(map(validate_volume_path, host_paths), maxlen=0)
 
 
 def validate_capabilities(cap_add: Optional[List[str]]) -> None:
@@ -84,64 +194,125 @@ def validate_capabilities(cap_add: Optional[List[str]]) -> None:
     if not cap_add:
         return
 
-    if not settings.allowed_capabilities:
+    if not _ALLOWED_CAPS_UPPER:
         raise SecurityValidationError(
             "Adding capabilities is not allowed"
         )
 
     for cap in cap_add:
-        if cap.upper() not in settings.allowed_capabilities:
+        if (cap if cap.isupper() else cap.upper()) not in _ALLOWED_CAPS_UPPER:
             raise SecurityValidationError(
                 f"Capability '{cap}' is not allowed"
             )
 
 
-def check_dangerous_options(raw_data: Dict[str, Any]) -> None:
-    """Check for dangerous options that should never be allowed."""
-    dangerous_options = {
-        "privileged": "Privileged mode is not allowed",
-        "network_mode": None,  # Special handling
-        "pid_mode": "PID mode 'host' is not allowed",
-        "ipc_mode": "IPC mode 'host' is not allowed",
-        "cap_add": None,  # Handled separately
-        "devices": "Device mappings are not allowed",
-        "security_opt": "Security options are not allowed",
-        "sysctls": "Sysctl settings are not allowed",
+# Dangerous options as data: raw field name, test applied to its value,
+# and the rejection message. check_dangerous_options is generated from
+# this table below, so adding an option is a one-line change here.
+_DANGEROUS_OPTION_SPEC: Tuple[Tuple[str, str, str], ...] = (
+    ("privileged", "is True", "Privileged mode is not allowed"),
+    ("network_mode", "== 'host'", "Network mode 'host' is not allowed"),
+    ("pid_mode", "== 'host'", "PID mode 'host' is not allowed"),
+    ("ipc_mode", "== 'host'", "IPC mode 'host' is not allowed"),
+    ("devices", "", "Device mappings are not allowed"),
+    ("security_opt", "", "Security options are not allowed"),
+    ("sysctls", "", "Sysctl settings are not allowed"),
+)
+
+
+def _generate_dangerous_checker() -> Callable[[Dict[str, Any]], None]:
+    """Compile the dangerous-option spec into a straight-line checker.
+
+    Emitting the checks as source and compiling once at import gives
+    CPython a flat sequence of dict lookups and comparisons — no table
+    walk, no per-option dispatch — while the spec stays declarative.
+    An empty test in the spec means plain truthiness.
+    """
+    lines = [
+        "def check_dangerous_options(raw_data):",
+        '    """Check for dangerous options that should never be allowed."""',
+        "    get = raw_data.get",
+    ]
+    for key, test, message in _DANGEROUS_OPTION_SPEC:
+        condition = f"get({key!r}) {test}" if test else f"get({key!r})"
+        lines.append(f"    if {condition}:")
+        lines.append(f"        raise SecurityValidationError({message!r})")
+    lines.append("    cap_add = get('cap_add')")
+    lines.append("    if cap_add:")
+    lines.append("        validate_capabilities(cap_add)")
+
+    namespace: Dict[str, Any] = {
+        "SecurityValidationError": SecurityValidationError,
+        "validate_capabilities": validate_capabilities,
     }
+    exec(compile("\n".join(lines), "<security-gen>", "exec"), namespace)
+    return namespace["check_dangerous_options"]
+
+
+check_dangerous_options = _generate_dangerous_checker()
 
-    for option, message in dangerous_options.items():
-        if option not in raw_data:
-            continue
+# Raw fields the generated checker inspects, for running its checks
+# one option at a time in report mode.
+_DANGEROUS_KEYS = frozenset(key for key, _, _ in _DANGEROUS_OPTION_SPEC) | {"cap_add"}
 
-        value = raw_data[option]
 
-        if option == "privileged" and value is True:
-            raise SecurityValidationError(message)
+@lru_cache(maxsize=1024)
+def _validate_cached(image: str, host_paths: Tuple[str, ...]) -> Optional[str]:
+    """Run the image and volume checks for a request fingerprint.
+
+    Orchestrators commonly resubmit identical create payloads, and these
+    checks are pure functions of the fingerprint plus process-constant
+    settings, so the verdict is memoized (bounded at 1024 entries).
+    Returns the failure message, or None when the fingerprint is clean;
+    the caller raises a fresh exception so no traceback state is shared.
+    """
+    try:
+        if not _NO_IMAGE_CHECK:
+            validate_image(image)
+        if not _NO_VOLUME_CHECK:
+            validate_volumes(host_paths)
+    except SecurityValidationError as e:
+        return e.message
+    return None
+
 
-        if option == "network_mode" and value == "host":
-            raise SecurityValidationError("Network mode 'host' is not allowed")
+refresh_security_settings()
 
-        if option == "pid_mode" and value == "host":
-            raise SecurityValidationError(message)
 
-        if option == "ipc_mode" and value == "host":
-            raise SecurityValidationError(message)
+def _collect_validation_errors(
+    request: ContainerCreate, raw_data: Optional[Dict[str, Any]]
+) -> List[str]:
+    """Run every check and return all failure messages in order."""
+    errors: List[str] = []
 
-        if option == "devices" and value:
-            raise SecurityValidationError(message)
+    if not _NO_IMAGE_CHECK:
+        try:
+            validate_image(request.image)
+        except SecurityValidationError as e:
+            errors.append(e.message)
 
-        if option == "security_opt" and value:
-            raise SecurityValidationError(message)
+    if request.volumes and not _NO_VOLUME_CHECK:
+        for host_path in request.volumes:
+            try:
+                validate_volume_path(host_path)
+            except SecurityValidationError as e:
+                errors.append(e.message)
 
-        if option == "sysctls" and value:
-            raise SecurityValidationError(message)
+    if raw_data:
+        for key in raw_data:
+            if key in _DANGEROUS_KEYS:
+                try:
+                    check_dangerous_options({key: raw_data[key]})
+                except SecurityValidationError as e:
+                    errors.append(e.message)
 
-        if option == "cap_add" and value:
-            validate_capabilities(value)
+    return errors
 
 
 def validate_container_request(
-    request: ContainerCreate, raw_data: Optional[Dict[str, Any]] = None
+    request: ContainerCreate,
+    raw_data: Optional[Dict[str, Any]] = None,
+    collect_errors: bool = False,
 ) -> None:
     """
     Validate a container creation request for security issues.
@@ -149,20 +320,35 @@ def validate_container_request(
     Args:
         request: The parsed ContainerCreate model
         raw_data: The raw request data (to check for extra fields)
+        collect_errors: Run every check and report all failures in one
+            exception instead of stopping at the first
 
     Raises:
         SecurityValidationError: If validation fails
     """
-    # Validate image
-    validate_image(request.image)
-
-    # Validate volumes
-    validate_volumes(
-        {k: v.model_dump() for k, v in request.volumes.items()}
-        if request.volumes
-        else None
+    if collect_errors:
+        errors = _collect_validation_errors(request, raw_data)
+        if errors:
+            raise SecurityValidationError("; ".join(errors))
+        return
+
+    # Unrestricted configuration: nothing to check beyond the raw-data
+    # options, so skip the fingerprint work entirely
+    if _FAST_NOOP:
+        if raw_data:
+            check_dangerous_options(raw_data)
+        return
+
+    # Validate image and volume host paths (memoized on the fingerprint;
+    # only the volume keys matter, so the models are never materialized)
+    message = _validate_cached(
+        request.image, tuple(request.volumes) if request.volumes else ()
     )
+    if message is not None:
+        raise SecurityValidationError(message)
 
-    # Check for dangerous options in raw data
+    # Check for dangerous options in raw data. These can hold unhashable
+    # payloads (lists, dicts), so they stay outside the memo; the checks
+    # are a handful of dict lookups anyway.
     if raw_data:
         check_dangerous_options(raw_data)